@@ -16,6 +16,7 @@ from __future__ import absolute_import, division, print_function
 import collections
 import itertools
 import warnings
+import weakref
 from contextlib import contextmanager
 
 import six
@@ -35,7 +36,7 @@ from cryptography.hazmat.backends.openssl.ciphers import (
 )
 from cryptography.hazmat.backends.openssl.cmac import _CMACContext
 from cryptography.hazmat.backends.openssl.dsa import (
-    _DSAParameters, _DSAPrivateKey, _DSAPublicKey
+    _DSAParameters, _DSAPrivateKey, _DSAPublicKey, _clone_dsa_cdata
 )
 from cryptography.hazmat.backends.openssl.ec import (
     _EllipticCurvePrivateKey, _EllipticCurvePublicKey
@@ -97,6 +98,8 @@ class Backend(object):
 
         self._cipher_registry = {}
         self._register_default_ciphers()
+        self._hash_ctx_templates = {}
+        self._dsa_parameters_cache = weakref.WeakValueDictionary()
         self.activate_osrandom_engine()
 
     def activate_builtin_random(self):
@@ -156,6 +159,18 @@ class Backend(object):
     def create_hash_ctx(self, algorithm):
         return _HashContext(self, algorithm)
 
+    def _hash_ctx_template(self, algorithm):
+        """
+        Returns a cached, already initialized _HashContext for the algorithm.
+        It must only be copied from, never updated or finalized.
+        """
+        template = self._hash_ctx_templates.get(algorithm.name)
+        if template is None:
+            template = _HashContext(self, algorithm)
+            self._hash_ctx_templates[algorithm.name] = template
+
+        return template
+
     def cipher_supported(self, cipher, mode):
         if self._evp_cipher_supported(cipher, mode):
             return True
@@ -337,8 +352,9 @@ class Backend(object):
             bin_ptr = self._ffi.new("unsigned char[]", bn_num_bytes)
             bin_len = self._lib.BN_bn2bin(bn, bin_ptr)
             assert bin_len > 0
-            assert bin_ptr != self._ffi.NULL
-            return int.from_bytes(self._ffi.buffer(bin_ptr)[:bin_len], "big")
+            # from_bytes reads the cffi buffer directly, so there is no need
+            # to copy it into an intermediate bytes object first.
+            return int.from_bytes(self._ffi.buffer(bin_ptr, bin_len), "big")
 
         else:
             # Under Python 2 the best we can do is hex()
@@ -590,12 +606,7 @@ class Backend(object):
         return _DSAParameters(self, ctx)
 
     def generate_dsa_private_key(self, parameters):
-        ctx = self._lib.DSA_new()
-        assert ctx != self._ffi.NULL
-        ctx = self._ffi.gc(ctx, self._lib.DSA_free)
-        ctx.p = self._lib.BN_dup(parameters._dsa_cdata.p)
-        ctx.q = self._lib.BN_dup(parameters._dsa_cdata.q)
-        ctx.g = self._lib.BN_dup(parameters._dsa_cdata.g)
+        ctx = _clone_dsa_cdata(self, parameters._dsa_cdata, False)
 
         self._lib.DSA_generate_key(ctx)
 
@@ -13,56 +13,197 @@
 
 from __future__ import absolute_import, division, print_function
 
+import collections
+import threading
+
 from cryptography import utils
-from cryptography.exceptions import InvalidSignature
-from cryptography.hazmat.backends.openssl.utils import _truncate_digest
-from cryptography.hazmat.primitives import hashes, interfaces
+from cryptography.exceptions import AlreadyFinalized, InvalidSignature
+from cryptography.hazmat.backends.openssl.utils import (
+    _bytes_to_int, _truncate_digest
+)
+from cryptography.hazmat.primitives import interfaces
 from cryptography.hazmat.primitives.asymmetric import dsa
 from cryptography.hazmat.primitives.interfaces import (
     DSAParametersWithNumbers, DSAPrivateKeyWithNumbers, DSAPublicKeyWithNumbers
 )
 
 
-def _truncate_digest_for_dsa(dsa_cdata, digest, backend):
+def _dsa_truncate_digest(digest, order_bits):
     """
-    This function truncates digests that are longer than a given DS
-    key's length so they can be signed. OpenSSL does this for us in
-    1.0.0c+ and it isn't needed in 0.9.8, but that leaves us with three
-    releases (1.0.0, 1.0.0a, and 1.0.0b) where this is a problem. This
-    truncation is not required in 0.9.8 because DSA is limited to SHA-1.
+    Truncates digest to the bit length of q, skipping the call entirely in
+    the common case where the digest already fits.
     """
+    if order_bits < 8 * len(digest):
+        return _truncate_digest(digest, order_bits)
 
-    order_bits = backend._lib.BN_num_bits(dsa_cdata.q)
-    return _truncate_digest(digest, order_bits)
+    return digest
 
 
-@utils.register_interface(interfaces.AsymmetricVerificationContext)
-class _DSAVerificationContext(object):
-    def __init__(self, backend, public_key, signature, algorithm):
+def _dsa_cdata_to_ints(backend, dsa_cdata, key_size, count=5):
+    """
+    Returns the first count of p, q, g, pub_key and priv_key of a DSA
+    structure as integers, with missing components returned as 0. They are
+    serialized by a single call into the bindings instead of one _bn_to_int
+    round-trip each.
+    """
+    buf_len = count * ((key_size + 7) // 8)
+    buf = backend._ffi.new("unsigned char[]", buf_len)
+    lens = backend._ffi.new("unsigned int[]", count)
+    total = backend._lib.Cryptography_dsa_export_numbers(
+        dsa_cdata, count, buf, buf_len, lens
+    )
+    if total > buf_len:
+        # Nothing guarantees g and y are smaller than p (y is never checked
+        # on load), so fall back to a buffer of exactly the required size.
+        buf_len = total
+        buf = backend._ffi.new("unsigned char[]", buf_len)
+        total = backend._lib.Cryptography_dsa_export_numbers(
+            dsa_cdata, count, buf, buf_len, lens
+        )
+        assert total == buf_len
+
+    data = backend._ffi.buffer(buf, total)[:]
+    numbers = []
+    offset = 0
+    for i in range(count):
+        numbers.append(_bytes_to_int(data[offset:offset + lens[i]]))
+        offset += lens[i]
+
+    return numbers
+
+
+def _clone_dsa_cdata(backend, dsa_cdata, with_pub_key):
+    """
+    Returns a garbage collected copy of the p, q and g of dsa_cdata, and of
+    pub_key if with_pub_key is true. Every BN_dup is checked on the C side,
+    so a single NULL check covers the whole copy.
+    """
+    clone = backend._lib.Cryptography_dsa_clone_params(
+        dsa_cdata, 1 if with_pub_key else 0
+    )
+    assert clone != backend._ffi.NULL
+    return backend._ffi.gc(clone, backend._lib.DSA_free)
+
+
+def _cached_dsa_parameters(backend, dsa_cdata, parameter_numbers):
+    """
+    Parameters are frequently shared between many keys, so the backend keeps
+    one _DSAParameters per (p, q, g) alive for as long as anything
+    references it. The cache lives on the backend because each
+    _DSAParameters is bound to the backend that created it.
+    """
+    key = (parameter_numbers.p, parameter_numbers.q, parameter_numbers.g)
+    parameters = backend._dsa_parameters_cache.get(key)
+    if parameters is None:
+        parameters = _DSAParameters(
+            backend, _clone_dsa_cdata(backend, dsa_cdata, False)
+        )
+        parameters._parameter_numbers = parameter_numbers
+        backend._dsa_parameters_cache[key] = parameters
+
+    return parameters
+
+
+class _DSADigestContext(object):
+    """
+    Digest handling shared by the DSA signature and verification contexts.
+
+    The EVP_MD_CTX is driven directly rather than through hashes.Hash so that
+    each update() is a single call into the bindings and so reset() can
+    reinitialize it in place.
+    """
+    __slots__ = (
+        "_backend",
+        "_algorithm",
+        "_template",
+        "_md_ctx",
+        "_finalized",
+        "_digest_update",
+        "_digest_buf",
+        "_digest_len",
+        "__weakref__",
+    )
+
+    def __init__(self, backend, algorithm):
+        if not isinstance(algorithm, interfaces.HashAlgorithm):
+            raise TypeError("Expected instance of interfaces.HashAlgorithm.")
+
         self._backend = backend
-        self._public_key = public_key
-        self._signature = signature
         self._algorithm = algorithm
-
-        self._hash_ctx = hashes.Hash(self._algorithm, self._backend)
+        self._template = self._backend._hash_ctx_template(self._algorithm)
+        self._md_ctx = self._template.copy()._ctx
+        self._finalized = False
+        self._digest_update = self._backend._lib.EVP_DigestUpdate
+        self._digest_buf = self._backend._ffi.new(
+            "unsigned char[]", self._backend._lib.EVP_MAX_MD_SIZE
+        )
+        self._digest_len = self._backend._ffi.new("unsigned int *")
 
     def update(self, data):
-        self._hash_ctx.update(data)
+        if self._finalized:
+            raise AlreadyFinalized("Context was already finalized.")
+        if not isinstance(data, bytes):
+            raise TypeError("data must be bytes.")
 
-    def verify(self):
-        self._dsa_cdata = self._backend._ffi.gc(self._public_key._dsa_cdata,
-                                                self._backend._lib.DSA_free)
+        res = self._digest_update(self._md_ctx, data, len(data))
+        assert res != 0
+
+    def _restart_digest(self):
+        res = self._backend._lib.EVP_MD_CTX_copy_ex(
+            self._md_ctx, self._template._ctx
+        )
+        assert res != 0
+        self._finalized = False
 
-        data_to_verify = self._hash_ctx.finalize()
+    def _finalize_digest(self, order_bits):
+        if self._finalized:
+            raise AlreadyFinalized("Context was already finalized.")
 
-        data_to_verify = _truncate_digest_for_dsa(
-            self._dsa_cdata, data_to_verify, self._backend
+        res = self._backend._lib.EVP_DigestFinal_ex(
+            self._md_ctx, self._digest_buf, self._digest_len
+        )
+        assert res != 0
+        self._finalized = True
+
+        # OpenSSL truncates digests for us in 1.0.0c+ and it isn't needed in
+        # 0.9.8 (where DSA is limited to SHA-1), but 1.0.0, 1.0.0a and 1.0.0b
+        # need the digest truncated to the bit length of q.
+        digest = _dsa_truncate_digest(
+            self._backend._ffi.buffer(
+                self._digest_buf, self._digest_len[0]
+            )[:],
+            order_bits
+        )
+        return digest, len(digest)
+
+
+@utils.register_interface(interfaces.AsymmetricVerificationContext)
+class _DSAVerificationContext(_DSADigestContext):
+    __slots__ = ("_public_key", "_signature", "_dsa_verify")
+
+    def __init__(self, backend, public_key, signature, algorithm):
+        super(_DSAVerificationContext, self).__init__(backend, algorithm)
+        self._public_key = public_key
+        self._signature = signature
+        self._dsa_verify = self._backend._lib.DSA_verify
+
+    def reset(self, signature):
+        """
+        Prepares the context to verify signature over a new message, reusing
+        the digest context and buffers instead of creating a new verifier.
+        """
+        self._restart_digest()
+        self._signature = signature
+
+    def verify(self):
+        data_to_verify, data_len = self._finalize_digest(
+            self._public_key._order_bits
         )
 
         # The first parameter passed to DSA_verify is unused by OpenSSL but
         # must be an integer.
-        res = self._backend._lib.DSA_verify(
-            0, data_to_verify, len(data_to_verify), self._signature,
+        res = self._dsa_verify(
+            0, data_to_verify, data_len, self._signature,
             len(self._signature), self._public_key._dsa_cdata)
 
         if res != 1:
@@ -75,48 +216,75 @@ class _DSAVerificationContext(object):
 
 
 @utils.register_interface(interfaces.AsymmetricSignatureContext)
-class _DSASignatureContext(object):
+class _DSASignatureContext(_DSADigestContext):
+    __slots__ = (
+        "_private_key", "_dsa_sign", "_dsa_sign_with_setup", "_unpack"
+    )
+
     def __init__(self, backend, private_key, algorithm):
-        self._backend = backend
+        super(_DSASignatureContext, self).__init__(backend, algorithm)
         self._private_key = private_key
-        self._algorithm = algorithm
-        self._hash_ctx = hashes.Hash(self._algorithm, self._backend)
+        self._dsa_sign = self._backend._lib.DSA_sign
+        self._dsa_sign_with_setup = (
+            self._backend._lib.Cryptography_dsa_sign_with_setup
+        )
+        # ffi.unpack copies a char buffer straight into bytes without an
+        # intermediate buffer object, but it is only available in cffi 1.6+.
+        self._unpack = getattr(self._backend._ffi, "unpack", None)
 
-    def update(self, data):
-        self._hash_ctx.update(data)
+    def reset(self):
+        """
+        Prepares the context to sign a new message, reusing the digest
+        context and buffers instead of creating a new signer.
+        """
+        self._restart_digest()
 
     def finalize(self):
-        data_to_sign = self._hash_ctx.finalize()
-        data_to_sign = _truncate_digest_for_dsa(
-            self._private_key._dsa_cdata, data_to_sign, self._backend
+        data_to_sign, data_len = self._finalize_digest(
+            self._private_key._order_bits
         )
-        sig_buf_len = self._backend._lib.DSA_size(self._private_key._dsa_cdata)
-        sig_buf = self._backend._ffi.new("unsigned char[]", sig_buf_len)
-        buflen = self._backend._ffi.new("unsigned int *")
-
-        # The first parameter passed to DSA_sign is unused by OpenSSL but
-        # must be an integer.
-        res = self._backend._lib.DSA_sign(
-            0, data_to_sign, len(data_to_sign), sig_buf,
-            buflen, self._private_key._dsa_cdata)
+        sig_buf, buflen = self._private_key._signature_buffers()
+
+        try:
+            kinv, r = self._private_key._presigned.popleft()
+        except IndexError:
+            # The first parameter passed to DSA_sign is unused by OpenSSL but
+            # must be an integer.
+            res = self._dsa_sign(
+                0, data_to_sign, data_len, sig_buf,
+                buflen, self._private_key._dsa_cdata)
+        else:
+            res = self._dsa_sign_with_setup(
+                0, data_to_sign, data_len, sig_buf,
+                buflen, self._private_key._dsa_cdata, kinv, r)
         assert res == 1
         assert buflen[0]
 
-        return self._backend._ffi.buffer(sig_buf)[:buflen[0]]
+        if self._unpack is not None:
+            return self._unpack(sig_buf, buflen[0])
+        return self._backend._ffi.buffer(sig_buf, buflen[0])[:]
 
 
 @utils.register_interface(DSAParametersWithNumbers)
 class _DSAParameters(object):
+    __slots__ = (
+        "_backend", "_dsa_cdata", "_parameter_numbers", "__weakref__"
+    )
+
     def __init__(self, backend, dsa_cdata):
         self._backend = backend
         self._dsa_cdata = dsa_cdata
+        self._parameter_numbers = None
 
     def parameter_numbers(self):
-        return dsa.DSAParameterNumbers(
-            p=self._backend._bn_to_int(self._dsa_cdata.p),
-            q=self._backend._bn_to_int(self._dsa_cdata.q),
-            g=self._backend._bn_to_int(self._dsa_cdata.g)
-        )
+        if self._parameter_numbers is None:
+            p, q, g = _dsa_cdata_to_ints(
+                self._backend, self._dsa_cdata,
+                self._backend._lib.BN_num_bits(self._dsa_cdata.p), 3
+            )
+            self._parameter_numbers = dsa.DSAParameterNumbers(p=p, q=q, g=g)
+
+        return self._parameter_numbers
 
     def generate_private_key(self):
         return self._backend.generate_dsa_private_key(self)
@@ -124,59 +292,138 @@ class _DSAParameters(object):
 
 @utils.register_interface(DSAPrivateKeyWithNumbers)
 class _DSAPrivateKey(object):
+    __slots__ = (
+        "_backend",
+        "_dsa_cdata",
+        "_key_size",
+        "_order_bits",
+        "_sig_buf_len",
+        "_scratch",
+        "_presigned",
+        "_private_numbers",
+        "__weakref__",
+    )
+
     def __init__(self, backend, dsa_cdata):
         self._backend = backend
         self._dsa_cdata = dsa_cdata
         self._key_size = self._backend._lib.BN_num_bits(self._dsa_cdata.p)
+        self._order_bits = self._backend._lib.BN_num_bits(self._dsa_cdata.q)
+        self._sig_buf_len = self._backend._lib.DSA_size(self._dsa_cdata)
+        self._scratch = threading.local()
+        self._presigned = collections.deque()
+        self._private_numbers = None
 
     key_size = utils.read_only_property("_key_size")
 
+    def presign(self, n):
+        """
+        Precomputes n (k^-1, r) pairs with DSA_sign_setup so that the next n
+        signatures made with this key skip the modular exponentiation that
+        dominates signing. Each pair is used by exactly one signature.
+
+        The nonces are not derived from the message: DSA_sign_setup has no
+        digest to work with, so k comes from plain BN_rand_range rather than
+        the private key and digest hedged generation DSA_sign uses in
+        OpenSSL 1.0.2+. Presigned signatures therefore depend entirely on the
+        quality of the RNG. What is shared with DSA_sign is the computation
+        of r and k^-1 from k, which uses the same constant-time exponentiation
+        unless the key sets DSA_FLAG_NO_EXP_CONSTTIME.
+        """
+        for _ in range(n):
+            kinv_ptr = self._backend._ffi.new("BIGNUM **")
+            r_ptr = self._backend._ffi.new("BIGNUM **")
+            res = self._backend._lib.DSA_sign_setup(
+                self._dsa_cdata, self._backend._ffi.NULL, kinv_ptr, r_ptr
+            )
+            assert res == 1
+            self._presigned.append((
+                self._backend._ffi.gc(
+                    kinv_ptr[0], self._backend._lib.BN_clear_free
+                ),
+                self._backend._ffi.gc(
+                    r_ptr[0], self._backend._lib.BN_clear_free
+                )
+            ))
+
+    def _signature_buffers(self):
+        """
+        Returns the signature buffer and length pointer used by DSA_sign. They
+        are allocated once per thread and reused across signatures, so callers
+        must copy the signature out before signing again.
+        """
+        try:
+            return self._scratch.sig_buf, self._scratch.buflen
+        except AttributeError:
+            self._scratch.sig_buf = self._backend._ffi.new(
+                "char[]", self._sig_buf_len
+            )
+            self._scratch.buflen = self._backend._ffi.new("unsigned int *")
+            return self._scratch.sig_buf, self._scratch.buflen
+
     def signer(self, signature_algorithm):
         return _DSASignatureContext(self._backend, self, signature_algorithm)
 
     def private_numbers(self):
-        return dsa.DSAPrivateNumbers(
-            public_numbers=dsa.DSAPublicNumbers(
-                parameter_numbers=dsa.DSAParameterNumbers(
-                    p=self._backend._bn_to_int(self._dsa_cdata.p),
-                    q=self._backend._bn_to_int(self._dsa_cdata.q),
-                    g=self._backend._bn_to_int(self._dsa_cdata.g)
+        # Key material never changes after construction, so the numbers are
+        # read out of OpenSSL once and shared by every later call.
+        if self._private_numbers is None:
+            p, q, g, y, x = _dsa_cdata_to_ints(
+                self._backend, self._dsa_cdata, self._key_size
+            )
+            self._private_numbers = dsa.DSAPrivateNumbers(
+                public_numbers=dsa.DSAPublicNumbers(
+                    parameter_numbers=dsa.DSAParameterNumbers(p=p, q=q, g=g),
+                    y=y
                 ),
-                y=self._backend._bn_to_int(self._dsa_cdata.pub_key)
-            ),
-            x=self._backend._bn_to_int(self._dsa_cdata.priv_key)
-        )
+                x=x
+            )
+
+        return self._private_numbers
 
     def public_key(self):
-        dsa_cdata = self._backend._lib.DSA_new()
-        assert dsa_cdata != self._backend._ffi.NULL
-        dsa_cdata = self._backend._ffi.gc(
-            dsa_cdata, self._backend._lib.DSA_free
-        )
-        dsa_cdata.p = self._backend._lib.BN_dup(self._dsa_cdata.p)
-        dsa_cdata.q = self._backend._lib.BN_dup(self._dsa_cdata.q)
-        dsa_cdata.g = self._backend._lib.BN_dup(self._dsa_cdata.g)
-        dsa_cdata.pub_key = self._backend._lib.BN_dup(self._dsa_cdata.pub_key)
-        return _DSAPublicKey(self._backend, dsa_cdata)
+        dsa_cdata = _clone_dsa_cdata(self._backend, self._dsa_cdata, True)
+        public_key = _DSAPublicKey(self._backend, dsa_cdata)
+        if self._private_numbers is not None:
+            public_key._public_numbers = self._private_numbers.public_numbers
+
+        return public_key
 
     def parameters(self):
-        dsa_cdata = self._backend._lib.DSA_new()
-        assert dsa_cdata != self._backend._ffi.NULL
-        dsa_cdata = self._backend._ffi.gc(
-            dsa_cdata, self._backend._lib.DSA_free
+        if self._private_numbers is not None:
+            parameter_numbers = (
+                self._private_numbers.public_numbers.parameter_numbers
+            )
+        else:
+            # Only read p, q and g so that asking for the parameters never
+            # pulls the private exponent into Python.
+            p, q, g = _dsa_cdata_to_ints(
+                self._backend, self._dsa_cdata, self._key_size, 3
+            )
+            parameter_numbers = dsa.DSAParameterNumbers(p=p, q=q, g=g)
+
+        return _cached_dsa_parameters(
+            self._backend, self._dsa_cdata, parameter_numbers
         )
-        dsa_cdata.p = self._backend._lib.BN_dup(self._dsa_cdata.p)
-        dsa_cdata.q = self._backend._lib.BN_dup(self._dsa_cdata.q)
-        dsa_cdata.g = self._backend._lib.BN_dup(self._dsa_cdata.g)
-        return _DSAParameters(self._backend, dsa_cdata)
 
 
 @utils.register_interface(DSAPublicKeyWithNumbers)
 class _DSAPublicKey(object):
+    __slots__ = (
+        "_backend",
+        "_dsa_cdata",
+        "_key_size",
+        "_order_bits",
+        "_public_numbers",
+        "__weakref__",
+    )
+
     def __init__(self, backend, dsa_cdata):
         self._backend = backend
         self._dsa_cdata = dsa_cdata
         self._key_size = self._backend._lib.BN_num_bits(self._dsa_cdata.p)
+        self._order_bits = self._backend._lib.BN_num_bits(self._dsa_cdata.q)
+        self._public_numbers = None
 
     key_size = utils.read_only_property("_key_size")
 
@@ -185,23 +432,60 @@ class _DSAPublicKey(object):
             self._backend, self, signature, signature_algorithm
         )
 
-    def public_numbers(self):
-        return dsa.DSAPublicNumbers(
-            parameter_numbers=dsa.DSAParameterNumbers(
-                p=self._backend._bn_to_int(self._dsa_cdata.p),
-                q=self._backend._bn_to_int(self._dsa_cdata.q),
-                g=self._backend._bn_to_int(self._dsa_cdata.g)
-            ),
-            y=self._backend._bn_to_int(self._dsa_cdata.pub_key)
+    def verify_batch(self, digests, signatures):
+        """
+        Verifies each signature against the already computed digest at the
+        same position and returns a list of booleans. All of the DSA_verify
+        calls are made from a single call into the bindings.
+        """
+        if len(digests) != len(signatures):
+            raise ValueError(
+                "digests and signatures must have the same length."
+            )
+        for digest, signature in zip(digests, signatures):
+            if not isinstance(digest, bytes):
+                raise TypeError("digests must be bytes.")
+            if not isinstance(signature, bytes):
+                raise TypeError("signatures must be bytes.")
+
+        digests = [
+            _dsa_truncate_digest(digest, self._order_bits)
+            for digest in digests
+        ]
+        n = len(digests)
+        digest_lens = self._backend._ffi.new(
+            "unsigned int[]", [len(digest) for digest in digests]
         )
+        sig_lens = self._backend._ffi.new(
+            "unsigned int[]", [len(signature) for signature in signatures]
+        )
+        results = self._backend._ffi.new("int[]", n)
+
+        self._backend._lib.Cryptography_dsa_verify_batch(
+            self._dsa_cdata, b"".join(digests), digest_lens,
+            b"".join(signatures), sig_lens, n, results
+        )
+
+        valid = [results[i] == 1 for i in range(n)]
+        if not all(valid):
+            self._backend._consume_errors()
+
+        return valid
+
+    def public_numbers(self):
+        if self._public_numbers is None:
+            p, q, g, y = _dsa_cdata_to_ints(
+                self._backend, self._dsa_cdata, self._key_size, 4
+            )
+            self._public_numbers = dsa.DSAPublicNumbers(
+                parameter_numbers=dsa.DSAParameterNumbers(p=p, q=q, g=g),
+                y=y
+            )
+
+        return self._public_numbers
 
     def parameters(self):
-        dsa_cdata = self._backend._lib.DSA_new()
-        assert dsa_cdata != self._backend._ffi.NULL
-        dsa_cdata = self._backend._ffi.gc(
-            dsa_cdata, self._backend._lib.DSA_free
+        return _cached_dsa_parameters(
+            self._backend, self._dsa_cdata,
+            self.public_numbers().parameter_numbers
         )
-        dsa_cdata.p = self._backend._lib.BN_dup(self._dsa_cdata.p)
-        dsa_cdata.q = self._backend._lib.BN_dup(self._dsa_cdata.q)
-        dsa_cdata.g = self._backend._lib.BN_dup(self._dsa_cdata.g)
-        return _DSAParameters(self._backend, dsa_cdata)
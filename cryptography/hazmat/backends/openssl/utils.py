@@ -13,6 +13,8 @@
 
 from __future__ import absolute_import, division, print_function
 
+import binascii
+
 import six
 
 
@@ -33,3 +35,11 @@ def _truncate_digest(digest, order_bits):
         digest = digest[:-1] + six.int2byte(six.indexbytes(digest, -1) & mask)
 
     return digest
+
+
+def _bytes_to_int(data):
+    if six.PY3:
+        # Python 3 has constant time from_bytes, so use that.
+        return int.from_bytes(data, "big")
+    else:
+        return int(binascii.hexlify(data) or b"0", 16)
@@ -52,6 +52,18 @@ int DSA_sign(int, const unsigned char *, int, unsigned char *, unsigned int *,
              DSA *);
 int DSA_verify(int, const unsigned char *, int, const unsigned char *, int,
                DSA *);
+int DSA_sign_setup(DSA *, BN_CTX *, BIGNUM **, BIGNUM **);
+
+int Cryptography_dsa_export_numbers(DSA *, int, unsigned char *, int,
+                                    unsigned int *);
+DSA *Cryptography_dsa_clone_params(DSA *, int);
+int Cryptography_dsa_sign_with_setup(int, const unsigned char *, int,
+                                     unsigned char *, unsigned int *, DSA *,
+                                     const BIGNUM *, const BIGNUM *);
+void Cryptography_dsa_verify_batch(DSA *, const unsigned char *,
+                                   const unsigned int *,
+                                   const unsigned char *,
+                                   const unsigned int *, unsigned int, int *);
 """
 
 MACROS = """
@@ -60,6 +72,142 @@ int DSA_generate_parameters_ex(DSA *, int, unsigned char *, int,
 """
 
 CUSTOMIZATIONS = """
+/* Writes the first count (at most 5) of p, q, g, pub_key and priv_key
+   big-endian and back to back into out, storing the length of each in lens,
+   so that secret components are only read when asked for. Missing
+   components have a length of 0. Returns the total number of bytes the
+   components need; nothing is written to out unless that fits in outlen, so
+   callers must retry with a larger buffer when the return value exceeds it. */
+int Cryptography_dsa_export_numbers(DSA *dsa, int count, unsigned char *out,
+                                    int outlen, unsigned int *lens) {
+    const BIGNUM *bns[5];
+    int i;
+    int total = 0;
+
+    bns[0] = dsa->p;
+    bns[1] = dsa->q;
+    bns[2] = dsa->g;
+    bns[3] = dsa->pub_key;
+    bns[4] = dsa->priv_key;
+
+    if (count > 5) {
+        count = 5;
+    }
+
+    for (i = 0; i < count; i++) {
+        if (bns[i] == NULL) {
+            lens[i] = 0;
+        } else {
+            lens[i] = BN_num_bytes(bns[i]);
+        }
+        total += lens[i];
+    }
+
+    if (total > outlen) {
+        return total;
+    }
+
+    for (i = 0; i < count; i++) {
+        if (bns[i] != NULL) {
+            BN_bn2bin(bns[i], out);
+            out += lens[i];
+        }
+    }
+
+    return total;
+}
+
+/* Returns a new DSA holding copies of p, q and g, plus pub_key if with_pub
+   is non-zero, or NULL if an allocation fails. */
+DSA *Cryptography_dsa_clone_params(DSA *src, int with_pub) {
+    DSA *dsa = DSA_new();
+    if (dsa == NULL) {
+        return NULL;
+    }
+
+    dsa->p = BN_dup(src->p);
+    dsa->q = BN_dup(src->q);
+    dsa->g = BN_dup(src->g);
+    if (with_pub) {
+        dsa->pub_key = BN_dup(src->pub_key);
+    }
+
+    if (dsa->p == NULL || dsa->q == NULL || dsa->g == NULL ||
+            (with_pub && dsa->pub_key == NULL)) {
+        /* DSA_free releases whichever BIGNUMs were copied. */
+        DSA_free(dsa);
+        return NULL;
+    }
+
+    return dsa;
+}
+
+/* Signs using a (kinv, r) pair precomputed by DSA_sign_setup. DSA_sign only
+   picks these up from the kinv and r fields of the DSA it is given, and
+   consumes them, so copies are placed on a temporary DSA that borrows the
+   key's BIGNUMs. The shared key is never modified, so concurrent signers
+   cannot pick up the same pair. The temporary DSA uses the key's ENGINE,
+   method and flags so it signs exactly as the key itself would. */
+int Cryptography_dsa_sign_with_setup(int type, const unsigned char *dgst,
+                                     int dlen, unsigned char *sig,
+                                     unsigned int *siglen, DSA *dsa,
+                                     const BIGNUM *kinv, const BIGNUM *r) {
+    DSA *tmp;
+    int res;
+
+    tmp = DSA_new_method(dsa->engine);
+    if (tmp == NULL) {
+        return 0;
+    }
+    /* A method set with DSA_set_method has no ENGINE to inherit it from. */
+    if (dsa->engine == NULL && tmp->meth != dsa->meth &&
+            !DSA_set_method(tmp, dsa->meth)) {
+        DSA_free(tmp);
+        return 0;
+    }
+    tmp->flags = dsa->flags;
+
+    tmp->p = dsa->p;
+    tmp->q = dsa->q;
+    tmp->g = dsa->g;
+    tmp->priv_key = dsa->priv_key;
+    tmp->kinv = BN_dup(kinv);
+    tmp->r = BN_dup(r);
+
+    if (tmp->kinv == NULL || tmp->r == NULL) {
+        res = 0;
+    } else {
+        res = DSA_sign(type, dgst, dlen, sig, siglen, tmp);
+    }
+
+    /* Hand the borrowed BIGNUMs back before DSA_free, which still releases
+       kinv and r if DSA_sign did not consume them. */
+    tmp->p = NULL;
+    tmp->q = NULL;
+    tmp->g = NULL;
+    tmp->priv_key = NULL;
+    DSA_free(tmp);
+
+    return res;
+}
+
+/* Runs DSA_verify over n digests and signatures, each packed back to back
+   with their lengths in digest_lens and sig_lens, and stores each result
+   in results. */
+void Cryptography_dsa_verify_batch(DSA *dsa, const unsigned char *digests,
+                                   const unsigned int *digest_lens,
+                                   const unsigned char *sigs,
+                                   const unsigned int *sig_lens,
+                                   unsigned int n, int *results) {
+    unsigned int i;
+
+    for (i = 0; i < n; i++) {
+        results[i] = DSA_verify(0, digests, digest_lens[i], sigs, sig_lens[i],
+                                dsa);
+        digests += digest_lens[i];
+        sigs += sig_lens[i];
+    }
+}
 """
 
 CONDITIONAL_NAMES = {}
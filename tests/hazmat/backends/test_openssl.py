@@ -17,13 +17,14 @@ import os
 import subprocess
 import sys
 import textwrap
+import weakref
 
 import pretend
 
 import pytest
 
 from cryptography import utils
-from cryptography.exceptions import InternalError, _Reasons
+from cryptography.exceptions import InternalError, InvalidSignature, _Reasons
 from cryptography.hazmat.backends.interfaces import EllipticCurveBackend
 from cryptography.hazmat.backends.openssl.backend import (
     Backend, backend
@@ -36,9 +37,13 @@ from cryptography.hazmat.primitives.ciphers.algorithms import AES
 from cryptography.hazmat.primitives.ciphers.modes import CBC, CTR
 from cryptography.hazmat.primitives.interfaces import BlockCipherAlgorithm
 
+from ..primitives.fixtures_dsa import DSA_KEY_1024, DSA_KEY_2048
 from ..primitives.fixtures_rsa import RSA_KEY_512
 from ..primitives.test_ec import _skip_curve_unsupported
-from ...utils import load_vectors_from_file, raises_unsupported_algorithm
+from ...utils import (
+    der_decode_dsa_signature, load_vectors_from_file,
+    raises_unsupported_algorithm
+)
 
 
 @utils.register_interface(interfaces.Mode)
@@ -428,6 +433,186 @@ class TestOpenSSLRSA(object):
             )
 
 
+class TestOpenSSLDSA(object):
+    def test_presign(self):
+        private_key = DSA_KEY_1024.private_key(backend)
+        public_key = private_key.public_key()
+        private_key.presign(2)
+        presigned_r = [
+            backend._bn_to_int(r) for _, r in private_key._presigned
+        ]
+
+        signatures = []
+        for _ in range(3):
+            signer = private_key.signer(hashes.SHA1())
+            signer.update(b"data")
+            signatures.append(signer.finalize())
+
+        assert not private_key._presigned
+        assert [
+            der_decode_dsa_signature(signature)[0]
+            for signature in signatures[:2]
+        ] == presigned_r
+        for signature in signatures:
+            verifier = public_key.verifier(signature, hashes.SHA1())
+            verifier.update(b"data")
+            verifier.verify()
+
+    def test_reset_contexts(self):
+        private_key = DSA_KEY_1024.private_key(backend)
+        public_key = private_key.public_key()
+
+        signer = private_key.signer(hashes.SHA1())
+        signer.update(b"first")
+        first = signer.finalize()
+        signer.reset()
+        signer.update(b"unused")
+        signer.reset()
+        signer.update(b"second")
+        second = signer.finalize()
+
+        verifier = public_key.verifier(first, hashes.SHA1())
+        verifier.update(b"first")
+        verifier.verify()
+        verifier.reset(second)
+        verifier.update(b"second")
+        verifier.verify()
+        verifier.reset(first)
+        verifier.update(b"second")
+        with pytest.raises(InvalidSignature):
+            verifier.verify()
+
+    def test_contexts_require_hash_algorithm(self):
+        private_key = DSA_KEY_1024.private_key(backend)
+        with pytest.raises(TypeError):
+            private_key.signer(object())
+        with pytest.raises(TypeError):
+            private_key.public_key().verifier(b"sig", object())
+
+    def test_weakrefs(self):
+        private_key = DSA_KEY_1024.private_key(backend)
+        public_key = private_key.public_key()
+        for obj in [
+            private_key,
+            public_key,
+            private_key.parameters(),
+            private_key.signer(hashes.SHA1()),
+            public_key.verifier(b"sig", hashes.SHA1()),
+        ]:
+            assert weakref.ref(obj)() is obj
+
+    def test_signer_update_requires_bytes(self):
+        private_key = DSA_KEY_1024.private_key(backend)
+        signer = private_key.signer(hashes.SHA1())
+        with pytest.raises(TypeError):
+            signer.update(u"text")
+
+    def test_public_numbers_with_oversized_y(self):
+        public_key = dsa.DSAPublicNumbers(
+            y=2 ** 4000,
+            parameter_numbers=DSA_KEY_1024.public_numbers.parameter_numbers
+        ).public_key(backend)
+        assert public_key.public_numbers().y == 2 ** 4000
+
+    def test_verify_batch(self):
+        private_key = DSA_KEY_1024.private_key(backend)
+        public_key = private_key.public_key()
+
+        digests = []
+        signatures = []
+        for message in [b"first", b"second"]:
+            digest = hashes.Hash(hashes.SHA1(), backend)
+            digest.update(message)
+            digests.append(digest.finalize())
+            signer = private_key.signer(hashes.SHA1())
+            signer.update(message)
+            signatures.append(signer.finalize())
+
+        assert public_key.verify_batch(digests, signatures) == [True, True]
+        assert public_key.verify_batch(
+            digests + digests[:1], [signatures[1], signatures[0], b"fakesig"]
+        ) == [False, False, False]
+        assert backend._lib.ERR_peek_error() == 0
+
+    @pytest.mark.skipif(
+        backend._lib.OPENSSL_VERSION_NUMBER < 0x1000000f,
+        reason="Requires a newer OpenSSL. Must be >= 1.0.0"
+    )
+    def test_verify_batch_truncates_digests(self):
+        # SHA-256 digests are longer than the 160-bit q of a 1024-bit key.
+        private_key = DSA_KEY_1024.private_key(backend)
+        public_key = private_key.public_key()
+
+        digests = []
+        signatures = []
+        for message in [b"first", b"second"]:
+            digest = hashes.Hash(hashes.SHA256(), backend)
+            digest.update(message)
+            digests.append(digest.finalize())
+            signer = private_key.signer(hashes.SHA256())
+            signer.update(message)
+            signatures.append(signer.finalize())
+
+        assert public_key.verify_batch(digests, signatures) == [True, True]
+        assert public_key.verify_batch(
+            digests, signatures[::-1]
+        ) == [False, False]
+
+    def test_parameters_are_shared(self):
+        private_key = DSA_KEY_1024.private_key(backend)
+        parameters = private_key.parameters()
+        assert private_key.public_key().parameters() is parameters
+        assert DSA_KEY_2048.private_key(backend).parameters() is not parameters
+
+    def test_parameters_cache_is_per_backend(self):
+        parameters = DSA_KEY_1024.private_key(backend).parameters()
+        other_backend = Backend()
+        other_parameters = DSA_KEY_1024.private_key(other_backend).parameters()
+        assert other_parameters is not parameters
+        assert other_parameters._backend is other_backend
+
+    def test_parameters_do_not_read_private_numbers(self):
+        private_key = DSA_KEY_1024.private_key(backend)
+        private_key.parameters()
+        assert private_key._private_numbers is None
+
+    def test_parameters_reuse_private_numbers(self):
+        private_key = DSA_KEY_1024.private_key(Backend())
+        parameter_numbers = (
+            private_key.private_numbers().public_numbers.parameter_numbers
+        )
+        parameters = private_key.parameters()
+        assert parameters.parameter_numbers() is parameter_numbers
+
+    def test_numbers_are_cached(self):
+        private_key = DSA_KEY_1024.private_key(backend)
+        private_numbers = private_key.private_numbers()
+        assert private_key.private_numbers() is private_numbers
+        assert private_numbers.x == DSA_KEY_1024.x
+
+        public_key = private_key.public_key()
+        assert public_key.public_numbers() is private_numbers.public_numbers
+
+        parameters = public_key.parameters()
+        assert parameters.parameter_numbers() is parameters.parameter_numbers()
+
+    def test_verify_batch_length_mismatch(self):
+        public_key = DSA_KEY_1024.public_numbers.public_key(backend)
+        with pytest.raises(ValueError):
+            public_key.verify_batch([b"digest"], [])
+
+    def test_verify_batch_requires_bytes(self):
+        public_key = DSA_KEY_1024.public_numbers.public_key(backend)
+        with pytest.raises(TypeError):
+            public_key.verify_batch([u"digest"], [b"signature"])
+        with pytest.raises(TypeError):
+            public_key.verify_batch([b"digest"], [u"signature"])
+
+    def test_verify_batch_empty(self):
+        public_key = DSA_KEY_1024.public_numbers.public_key(backend)
+        assert public_key.verify_batch([], []) == []
+
+
 @pytest.mark.skipif(
     backend._lib.OPENSSL_VERSION_NUMBER <= 0x10001000,
     reason="Requires an OpenSSL version >= 1.0.1"
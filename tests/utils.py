@@ -18,7 +18,7 @@ import collections
 import re
 from contextlib import contextmanager
 
-from pyasn1.codec.der import encoder
+from pyasn1.codec.der import decoder, encoder
 from pyasn1.type import namedtype, univ
 
 import pytest
@@ -96,6 +96,11 @@ def der_encode_dsa_signature(r, s):
     return encoder.encode(sig)
 
 
+def der_decode_dsa_signature(signature):
+    sig, _ = decoder.decode(signature, asn1Spec=_DSSSigValue())
+    return int(sig.getComponentByName('r')), int(sig.getComponentByName('s'))
+
+
 def load_vectors_from_file(filename, loader):
     with cryptography_vectors.open_vector_file(filename) as vector_file:
         return loader(vector_file)